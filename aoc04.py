@@ -4,7 +4,7 @@ import numpy as np
 import scipy.signal as sig
 from funcy import autocurry
 
-from aoc_util import AOC, np_raw_table, run_aoc
+from aoc_util import AOC, metric_count, np_raw_table, run_aoc
 
 
 def aoc04(grid: np.typing.NDArray[np.int8]) -> AOC:
@@ -14,6 +14,7 @@ def aoc04(grid: np.typing.NDArray[np.int8]) -> AOC:
 
     taken = 0
     while ...:
+        metric_count("aoc04.iterations")
         takeable = sig.convolve(grid, WEIGHTS, mode="same") > 0
         n = np.sum(takeable)
         if n == 0:
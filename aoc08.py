@@ -1,36 +1,103 @@
 #!/usr/bin/env python3
 
 
+from bisect import bisect_left
+
 import numpy as np
-from scipy.spatial.distance import pdist
+from scipy.sparse import coo_array
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
+from scipy.spatial import Delaunay, KDTree
 
-from aoc_util import AOC, run_aoc
+from aoc_util import AOC, metric_count, metric_gauge, metric_span, run_aoc
 
 
 def aoc08(boxes: np.typing.NDArray[int]) -> AOC:
-    def get_circuits_and_last_boxes(closest):
-        circuits = np.arange(N, dtype=int)
-        n = N
-        for box1, box2 in closest:
-            c1, c2 = circuits[box1], circuits[box2]
-            if c1 != c2:
-                circuits[circuits == c2] = c1
-                n -= 1
-            if n == 1:
-                break
-        return circuits, box1, box2
+    def sqdist(edges):
+        diff = boxes[edges[:, 0]] - boxes[edges[:, 1]]
+        return np.einsum("ij,ij->i", diff, diff)
+
+    def by_length(edges):
+        # same order as a stable argsort of pdist, exact on integer coordinates
+        edges = np.sort(edges, axis=1).astype(np.int64)
+        edges = np.divmod(np.unique(edges[:, 0] * N + edges[:, 1]), N)
+        edges = np.column_stack(edges)
+        d2 = sqdist(edges)
+        order = np.argsort(d2, stable=True)
+        return edges[order], d2[order]
+
+    def shortest_edges(n):
+        # grow k nearest neighbour candidates only for boxes which could still
+        # have an unseen edge shorter than the current n-th shortest candidate
+        tree = KDTree(boxes)
+        pending = np.arange(N)
+        edges = np.empty((0, 2), dtype=int)
+        k = min(N - 1, 8)
+        while True:
+            metric_count("aoc08.knn_rounds")
+            metric_gauge("aoc08.knn_pending", len(pending))
+            _, nbrs = tree.query(boxes[pending], k=k + 1)
+            # a box sharing the position may come before the query box itself
+            found = np.column_stack([np.repeat(pending, k + 1), nbrs.ravel()])
+            found = found[found[:, 0] != found[:, 1]]
+            edges, d2 = by_length(np.concatenate([edges, found]))
+            edges, d2 = edges[:n], d2[:n]
+            if k == N - 1:
+                return edges
+            kth = sqdist(np.column_stack([pending, nbrs[:, -1]]))
+            pending = pending[kth <= (d2[-1] if len(d2) == n else np.inf)]
+            if len(pending) == 0:
+                return edges
+            k = min(N - 1, 2 * k)
+
+    def delaunay_edges():
+        # the euclidean minimum spanning tree is a subgraph of the triangulation,
+        # taken within the affine hull for coplanar or collinear boxes
+        points, first, inverse = np.unique(
+            boxes, axis=0, return_index=True, return_inverse=True
+        )
+        points = points - points.mean(axis=0)
+        _, sv, axes = np.linalg.svd(points, full_matrices=False)
+        dim = max(1, np.sum(sv > sv[0] * 1e-9))
+        points = points @ axes[:dim].T
+        if dim == 1:
+            order = np.argsort(points[:, 0])
+            simplices = np.column_stack([order[:-1], order[1:]])
+        else:
+            with metric_span("aoc08.delaunay"):
+                simplices = Delaunay(points).simplices
+        a, b = np.triu_indices(simplices.shape[1], k=1)
+        edges = np.column_stack([simplices[:, a].ravel(), simplices[:, b].ravel()])
+        # qhull leaves out duplicates, connect them to their first occurrence
+        twins = np.column_stack([first[inverse.ravel()], np.arange(N)])
+        return np.concatenate([first[edges], twins[twins[:, 0] != twins[:, 1]]])
+
+    def graph(edges, weights=None):
+        weights = np.ones(len(edges)) if weights is None else weights
+        return coo_array((weights, (edges[:, 0], edges[:, 1])), shape=(N, N))
 
     N = boxes.shape[0]
     CABLES = 10 if N == 20 else 1000  # implicit param for example
-    closest_condensed = np.argsort(pdist(boxes))
-    triu_a, triu_b = np.triu_indices(N, k=1)
-    closest = np.column_stack([triu_a[closest_condensed], triu_b[closest_condensed]])
 
-    circuits, _, _ = get_circuits_and_last_boxes(closest[:CABLES])
+    n, circuits = connected_components(graph(shortest_edges(CABLES)), directed=False)
+    metric_gauge("aoc08.circuits_merged", N - n)
     _, sizes = np.unique(circuits, return_counts=True)
     yield np.prod(np.sort(sizes)[-3:])
 
-    _, box1, box2 = get_circuits_and_last_boxes(closest)
+    edges, d2 = by_length(delaunay_edges())
+    metric_gauge("aoc08.mst_candidates", len(edges))
+    # offset weights, csgraph takes a zero weight for a missing edge
+    longest = minimum_spanning_tree(graph(edges, d2 + 1.0)).max() - 1
+    # the last edge kruskal takes among ties of the longest length, pdist order,
+    # is the end of the shortest prefix of ties connecting the shorter circuits
+    n, circuits = connected_components(graph(edges[d2 < longest]), directed=False)
+    tied = edges[d2 == longest]
+
+    def connects(m):
+        ends = circuits[tied[:m]]
+        joined = coo_array((np.ones(m), (ends[:, 0], ends[:, 1])), shape=(n, n))
+        return connected_components(joined, directed=False)[0] == 1
+
+    box1, box2 = tied[bisect_left(range(len(tied)), True, key=connects) - 1]
     yield boxes[box1, 0] * boxes[box2, 0]
 
 
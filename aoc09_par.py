@@ -1,10 +1,24 @@
 #!/usr/bin/env python3
 
 import concurrent.futures as fut
+import os
 
 import numpy as np
 
-from aoc_util import AOC, run_aoc
+from aoc_util import AOC, SharedArray, np_shared, run_aoc
+
+
+def valid_rects(rects, edges):
+    # cross table whether edge is wholly <left, above, right, below> of rect
+    rects_x_edges = edges[None, :, 2] <= rects[:, None, 0]
+    rects_x_edges |= edges[None, :, 3] <= rects[:, None, 1]
+    rects_x_edges |= edges[None, :, 0] >= rects[:, None, 2]
+    rects_x_edges |= edges[None, :, 1] >= rects[:, None, 3]
+    return np.all(rects_x_edges, axis=1)
+
+
+def valid_chunk(rects: SharedArray, edges: SharedArray, valid: SharedArray, chunk):
+    valid.attach()[chunk] = valid_rects(rects.attach()[chunk], edges.attach())
 
 
 def aoc09(tiles: np.typing.NDArray[int]) -> AOC:
@@ -21,21 +35,24 @@ def aoc09(tiles: np.typing.NDArray[int]) -> AOC:
     edges[:, 0::2].sort(axis=1)
     edges[:, 1::2].sort(axis=1)
 
-    # cross table whether edge is wholly <left, above, right, below> of rect
-    with fut.ThreadPoolExecutor(max_workers=4) as pool:
-        ready = fut.as_completed(
-            [
-                pool.submit(np.greater_equal.outer, rects[:, 0], edges[:, 2]),
-                pool.submit(np.greater_equal.outer, rects[:, 1], edges[:, 3]),
-                pool.submit(np.less_equal.outer, rects[:, 2], edges[:, 0]),
-                pool.submit(np.less_equal.outer, rects[:, 3], edges[:, 1]),
-            ]
+    n = os.process_cpu_count() or 1
+    if n < 2:
+        valid = valid_rects(rects, edges)
+    else:
+        # workers get handles only and attach rects, edges, valid zero-copy
+        shared = (
+            np_shared(rects),
+            np_shared(edges),
+            np_shared(np.empty(len(rects), bool)),
         )
-        rects_x_edges = next(ready).result()
-        rects_x_edges |= next(ready).result()
-        rects_x_edges |= next(ready).result()
-        rects_x_edges |= next(ready).result()
-    valid = np.all(rects_x_edges, axis=1)
+        bounds = np.linspace(0, len(rects), n + 1, dtype=int)
+        with fut.ProcessPoolExecutor(n) as pool:
+            for r in [
+                pool.submit(valid_chunk, *shared, slice(a, b))
+                for a, b in zip(bounds, bounds[1:])
+            ]:
+                r.result()
+        valid = shared[2].attach()
     yield np.max(areas[valid])
 
 
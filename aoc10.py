@@ -7,7 +7,7 @@ import numpy as np
 from funcy import lmap
 from scipy.optimize import linprog
 
-from aoc_util import AOC, run_aoc
+from aoc_util import AOCParts, metric_count, metric_span, run_aoc
 
 
 def create_machine(line: str):
@@ -29,7 +29,7 @@ def aoc10(
     lights: list[np.typing.NDArray[int, bool]],
     buttons: list[np.typing.NDArray[(int, int), bool]],
     joltages: list[np.typing.NDArray[int, int]],
-) -> AOC:
+) -> AOCParts:
     @cache
     def choices_asc(n):
         return lmap(list, sorted(product((False, True), repeat=n), key=sum))
@@ -40,19 +40,140 @@ def aoc10(
             if np.all(lights == np.logical_xor.reduce(selected, axis=0)):
                 return selected.shape[0]
 
+    WORK_LIMIT = 1 << 18  # max search effort before falling back to linprog
+    LEAF_SIZE = 1 << 10  # max free press combinations checked at once
+
+    def eliminate(M):
+        """Fraction-free Gauss-Jordan elimination of [A | b], exact on integers"""
+
+        M = M.astype(np.int64)
+        pivots = []
+        for c in range(M.shape[1] - 1):
+            r = len(pivots)
+            if r == len(M):
+                break
+            (nz,) = np.nonzero(M[r:, c])
+            if len(nz) == 0:
+                continue
+            M[[r, r + nz[0]]] = M[[r + nz[0], r]]
+            M[r] *= np.sign(M[r, c])
+            others = np.arange(len(M)) != r
+            M[others] = M[others] * M[r, c] - np.outer(M[others, c], M[r])
+            M //= np.maximum(np.gcd.reduce(M, axis=1), 1)[:, None]
+            pivots.append(c)
+        return M, pivots
+
+    def search(d, C, rhs, ub):
+        """Branch and bound over free presses f, minimizing presses in total
+
+        Pivot presses are x = (rhs - C f) / d, which must be non-negative
+        integers. Scaled by L = lcm(d) the total is K + W f, all integers.
+        Returns the minimal total, or None once WORK_LIMIT is exceeded.
+        """
+
+        L = np.lcm.reduce(d)
+        K, W = np.sum(L // d * rhs), L - (L // d) @ C
+        best, work = None, 0
+
+        def tighten(lo, hi, A, b):
+            # A f <= b bounds each f, given the best case for all others
+            A_pos, A_neg = np.where(A > 0, A, 1), np.where(A < 0, -A, 1)
+            while True:
+                least = np.where(A > 0, A * lo, A * hi)
+                slack = b - least.sum(axis=1)
+                if np.any(slack < 0):
+                    return None
+                t = slack[:, None] + least
+                big = np.iinfo(np.int64).max
+                hi2 = np.minimum(hi, np.min(np.where(A > 0, t // A_pos, big), axis=0))
+                lo2 = np.maximum(lo, np.max(np.where(A < 0, -(t // A_neg), 0), axis=0))
+                if np.any(lo2 > hi2):
+                    return None
+                if np.array_equal(lo, lo2) and np.array_equal(hi, hi2):
+                    return lo, hi
+                lo, hi = lo2, hi2
+
+        def branch(lo, hi):
+            nonlocal best, work
+            work += LEAF_SIZE
+            if work > WORK_LIMIT:
+                raise OverflowError
+            # x >= 0, and once a solution is known, K + W f < best
+            if best is None:
+                bounds = tighten(lo, hi, C, rhs)
+            else:
+                bounds = tighten(
+                    lo, hi, np.vstack([C, W]), np.append(rhs, best - 1 - K)
+                )
+            if bounds is None:
+                return
+            lo, hi = bounds
+            if np.prod(hi - lo + 1, dtype=float) <= LEAF_SIZE:
+                F = np.indices(hi - lo + 1).reshape(len(lo), -1).T + lo
+                work += F.size
+                x, rem = np.divmod(rhs - F @ C.T, d)
+                totals = K + F[np.all((rem == 0) & (x >= 0), axis=1)] @ W
+                if len(totals) and (best is None or totals.min() < best):
+                    best = totals.min()
+                return
+            # bisect the widest range, cheaper half first
+            i = np.argmax(hi - lo)
+            mid = (lo[i] + hi[i]) // 2
+            halves = [(lo[i], mid), (mid + 1, hi[i])]
+            for a, b in halves[:: 1 if W[i] >= 0 else -1]:
+                lo2, hi2 = lo.copy(), hi.copy()
+                lo2[i], hi2[i] = a, b
+                branch(lo2, hi2)
+
+        if len(ub) == 0:
+            x, rem = np.divmod(rhs, d)
+            return int(x.sum()) if not rem.any() and np.all(x >= 0) else None
+        try:
+            branch(np.zeros_like(ub), ub)
+        except OverflowError:
+            return None
+        assert best is not None and best % L == 0, "no solution"
+        return int(best // L)
+
     def analyze2(joltage, btns):
-        result = linprog(
-            np.ones(len(btns)),
-            A_eq=btns.T,
-            b_eq=joltage,
-            integrality=1,
-            method="highs",
-        )
+        # no button can be pressed more often than its smallest counter allows,
+        # and one wired to no counter is never worth pressing at all
+        bounds = np.min(np.where(btns, joltage, joltage.max()), axis=1)
+        bounds[~btns.any(axis=1)] = 0
+        # pivot on buttons with large bounds, leaving small ranges to search
+        order = np.argsort(-bounds, stable=True)
+        bounds = bounds[order]
+        M, pivots = eliminate(np.column_stack([btns.T[:, order], joltage]))
+        r = len(pivots)
+        assert not M[r:, -1].any(), "no solution"
+        free = np.setdiff1d(np.arange(len(btns)), pivots)
+
+        d, C, rhs = M[np.arange(r), pivots], M[:r, free], M[:r, -1]
+        presses = search(d, C, rhs, bounds[free])
+        if presses is None:
+            return analyze2_linprog(joltage, btns)
+        metric_count("aoc10.exact_calls")
+        return presses
+
+    def analyze2_linprog(joltage, btns):
+        metric_count("aoc10.linprog_calls")
+        with metric_span("aoc10.linprog"):
+            result = linprog(
+                np.ones(len(btns)),
+                A_eq=btns.T,
+                b_eq=joltage,
+                integrality=1,
+                method="highs",
+            )
         assert result.success, "linprog failed"
-        return int(result.fun)
+        presses = np.round(result.x).astype(int)
+        assert np.all(btns.T @ presses == joltage), "linprog result not exact"
+        return int(presses.sum())
 
-    yield sum(map(analyze, lights, buttons))
-    yield sum(map(analyze2, joltages, buttons))
+    return (
+        lambda: sum(map(analyze, lights, buttons)),
+        lambda: sum(map(analyze2, joltages, buttons)),
+    )
 
 
 if __name__ == "__main__":
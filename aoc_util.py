@@ -1,22 +1,31 @@
 """AOC puzzle solving support"""
 
 import abc
+import contextlib
 import logging
 import os
 import sys
 import timeit
 from argparse import ArgumentParser
 from logging import debug, error, info, warn
-from typing import Any
+from typing import Any, NamedTuple
 
 _keep_imports = error, warn, info, debug  # re-export
 _root_logger = logging.getLogger()
+_metrics_logger = logging.getLogger("aoc.metrics")  # enabled by --metrics
+_metrics_logger.setLevel(100)
+_metrics_logger.propagate = False
+_metrics = {}  # name -> metric record
+_shared_blocks = {}  # name -> (SharedMemory, pid of owner or None if attached)
 
 # SESSION = os.environ.get("SESSION")
 LOGLEVEL = os.environ.get("LOGLEVEL", "INFO").upper()
 AOC_INTERACTIVE = int(os.environ.get("AOC_INTERACTIVE") or 0)
 
 type AOC[T = int] = abc.Generator[T]
+# closures handed to forked workers unpickled, run sequentially without fork
+# or a second CPU
+type AOCParts[T = int] = tuple[abc.Callable[[], T], ...]
 
 
 def _fix_lambda(f=None, default=lambda x: x):
@@ -92,6 +101,186 @@ def np_condense(s: Any) -> str:
     return str(s).replace(" ", "").replace("[", "").replace("]", "")
 
 
+# --- metrics, recorded only with --metrics ---
+
+
+def metric_count(name: str, n=1) -> None:
+    """Increment counter name by n"""
+
+    if _metrics_logger.isEnabledFor(logging.INFO):
+        m = _metrics.setdefault(name, dict(type="counter", value=0))
+        m["value"] += n
+
+
+def metric_gauge(name: str, value) -> None:
+    """Record the current value of gauge name"""
+
+    if _metrics_logger.isEnabledFor(logging.INFO):
+        m = _metrics.setdefault(name, dict(type="gauge", n=0, min=value, max=value))
+        m["n"] += 1
+        m["value"] = value
+        m["min"] = min(m["min"], value)
+        m["max"] = max(m["max"], value)
+
+
+def metric_span(name: str):
+    """Context manager timing a span of code, totals over all entries"""
+
+    if _metrics_logger.isEnabledFor(logging.INFO):
+        return _metric_span(name)
+    return _no_span
+
+
+_no_span = contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def _metric_span(name):
+    t = timeit.default_timer()
+    try:
+        yield
+    finally:
+        t = timeit.default_timer() - t
+        m = _metrics.setdefault(name, dict(type="span", n=0, total=0.0, max=0.0))
+        m["n"] += 1
+        m["total"] += t
+        m["max"] = max(m["max"], t)
+
+
+def _take_metrics() -> dict:
+    """Return and reset all metrics recorded so far"""
+
+    metrics = dict(_metrics)
+    _metrics.clear()
+    return metrics
+
+
+def _merge_metrics(metrics: dict) -> None:
+    """Merge metrics recorded elsewhere, e.g. in a worker process"""
+
+    for name, m in metrics.items():
+        if name not in _metrics:
+            _metrics[name] = m
+            continue
+        own = _metrics[name]
+        match m["type"]:
+            case "counter":
+                own["value"] += m["value"]
+            case "gauge":
+                own.update(n=own["n"] + m["n"], value=m["value"])
+                own.update(min=min(own["min"], m["min"]), max=max(own["max"], m["max"]))
+            case "span":
+                own.update(n=own["n"] + m["n"], total=own["total"] + m["total"])
+                own.update(max=max(own["max"], m["max"]))
+
+
+def _setup_metrics(fn: str) -> None:
+    handler = logging.FileHandler(fn, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _metrics_logger.addHandler(handler)
+    _metrics_logger.setLevel(logging.INFO)
+
+
+def _log_metrics(run: dict, times: list[float], metrics: dict) -> None:
+    """Log one run as JSON lines: run metadata, part timings, metrics"""
+
+    import json  # noqa: autoimport
+
+    def log(event, **record):
+        record = dict(event=event, run=run["run"], input=run["input"], **record)
+        _metrics_logger.info(json.dumps(record, default=_json_default))
+
+    if _metrics_logger.isEnabledFor(logging.INFO):
+        _metrics_logger.info(
+            json.dumps(dict(event="run", **run), default=_json_default)
+        )
+        for i, t in enumerate(times, start=1):
+            log("part", part=i, time=t)
+        for name, m in metrics.items():
+            log("metric", name=name, **m)
+
+
+def _json_default(o):
+    return o.item() if hasattr(o, "item") else str(o)
+
+
+def _now():
+    import datetime  # noqa: autoimport
+
+    return datetime.datetime.now().astimezone()
+
+
+def _run_info(aocf, filename: str, start, **kw) -> dict:
+    """Run metadata, start is the local time the run of filename started at"""
+
+    import platform  # noqa: autoimport
+
+    return dict(
+        run=f"{aocf.__name__}@{start:%Y%m%dT%H%M%S.%f}",
+        solver=aocf.__name__,
+        input=filename,
+        start=start.isoformat(),
+        argv=sys.argv[1:],
+        python=platform.python_version(),
+        host=platform.node(),
+        **kw,
+    )
+
+
+# --- numpy arrays in shared memory for worker processes ---
+
+
+class SharedArray(NamedTuple):
+    """Lightweight picklable handle of a numpy array in shared memory"""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+    def attach(self) -> Any:
+        """Return the shared array, mapping its block once per process"""
+
+        import numpy as np  # noqa: autoimport
+
+        if self.name not in _shared_blocks:
+            from multiprocessing.shared_memory import SharedMemory  # noqa: autoimport
+
+            shm = SharedMemory(self.name, track=False)
+            _shared_blocks[self.name] = shm, None
+        shm, _ = _shared_blocks[self.name]
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+
+
+def np_shared(a) -> SharedArray:
+    """Copy np.array a to a new shared memory block, return its handle
+
+    Workers reattach the handle zero-copy with attach(). Blocks live until
+    the end of run_aoc, or of one input in batch mode, even if it fails.
+    """
+
+    from multiprocessing.shared_memory import SharedMemory  # noqa: autoimport
+
+    import numpy as np  # noqa: autoimport
+
+    a = np.asarray(a)
+    shm = SharedMemory(create=True, size=max(a.nbytes, 1))
+    _shared_blocks[shm.name] = shm, os.getpid()
+    shared = SharedArray(shm.name, a.shape, a.dtype.str)
+    shared.attach()[...] = a
+    return shared
+
+
+def _release_shared() -> None:
+    """Unmap all shared blocks, and unlink those created by this process"""
+
+    for name, (shm, owner) in list(_shared_blocks.items()):
+        del _shared_blocks[name]
+        with contextlib.suppress(BufferError):  # arrays may still reference it
+            shm.close()
+        if owner == os.getpid():
+            shm.unlink()
+
+
 # --- input readers and parsers ---
 
 
@@ -151,6 +340,18 @@ def mk_arg_parser(day: int, loglevel) -> ArgumentParser:
         const=f"data/aoc{day:02}_example.txt",
         help=f"read input from data/aoc{day:02}_example.txt",
     )
+    parser.add_argument(
+        "--inputs",
+        metavar="GLOB",
+        help="batch mode: run all matching input files, checking <input>.results"
+        " (always timed, excludes --input, --example, --timeit, --show-input)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="batch mode: number of worker processes (1)",
+    )
     parser.add_argument(
         "--test",
         action="store_true",
@@ -169,6 +370,11 @@ def mk_arg_parser(day: int, loglevel) -> ArgumentParser:
     parser.add_argument(
         "--timeit", action="store_true", default=False, help="show timing information"
     )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="append JSON lines with run info, part timings and metrics to FILE",
+    )
     parser.add_argument(
         "--loglevel",
         default=loglevel,
@@ -223,6 +429,185 @@ def read_input(
     return transform(input)
 
 
+def _read_results(fn: str) -> list[str]:
+    """Read expected results, a trailing backslash continues a multiline result"""
+    with open(fn) as fd:
+        parts = fd.read().replace("\\\n", "\0").splitlines()
+    return [part.replace("\0", "\n") for part in parts]
+
+
+def _write_results(fn: str, results: list) -> None:
+    with open(fn, "w") as fd:
+        fd.write("\n".join(str(r).replace("\n", "\\\n") for r in results))
+
+
+_batch_job = None  # (aocf, read_input args), inherited by forked workers
+_parts = None  # independent part callables, inherited by forked workers
+
+
+def _run_part(i: int) -> tuple[Any, float, dict]:
+    _metrics.clear()
+    t = timeit.default_timer()
+    try:
+        r = _parts[i]()
+    finally:
+        _release_shared()
+    return r, timeit.default_timer() - t, _take_metrics()
+
+
+def _fork_pool(n: int):
+    """Process pool of up to n forked workers, one per CPU at most, or None
+
+    Forking hands module state like _parts closures to the workers without
+    pickling. The parent may have numpy threads running, which is why
+    Python 3.14 no longer forks by default, and macOS does not support it
+    safely at all. None is returned there, and when fewer than 2 workers
+    would run, as forking them costs more than they could win back.
+    """
+
+    import concurrent.futures as fut  # noqa: autoimport
+    import multiprocessing as mp  # noqa: autoimport
+
+    n = min(n, os.process_cpu_count() or 1)
+    if n < 2 or sys.platform == "darwin" or "fork" not in mp.get_all_start_methods():
+        return None
+    return fut.ProcessPoolExecutor(n, mp_context=mp.get_context("fork"))
+
+
+def _run_parts(parts: AOCParts):
+    """Run independent parts concurrently, yield (result, time) in order
+
+    Metrics recorded in the workers are merged back. Without fork, or with
+    fewer than 2 parts or CPUs, they are run sequentially in this process.
+    """
+
+    global _parts
+    pool = _fork_pool(len(parts))
+    if pool is None:
+        for part in parts:
+            t = timeit.default_timer()
+            r = part()
+            yield r, timeit.default_timer() - t
+        return
+
+    _parts = parts
+    with pool:
+        for r, t, metrics in pool.map(_run_part, range(len(parts))):
+            _merge_metrics(metrics)
+            yield r, t
+
+
+def _run_batch_job(filename: str) -> dict:
+    """Run one input of a batch, catching errors"""
+
+    aocf, reader_args = _batch_job
+    job = dict(input=filename, start=_now(), results=[], times=[], error=None)
+    job.update(setup=0.0, total=0.0)
+    _metrics.clear()
+    t_start = t = timeit.default_timer()
+    try:
+        aocf_args = read_input(filename, *reader_args)
+        t, t0 = timeit.default_timer(), t
+        job["setup"] = t - t0
+        solved = aocf(*aocf_args)
+        if isinstance(solved, tuple):
+            solved = (part() for part in solved)
+        for r in solved:
+            t, t0 = timeit.default_timer(), t
+            job["times"].append(t - t0)
+            job["results"].append(str(r))
+    except Exception as e:
+        job["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        _release_shared()
+    job["total"] = timeit.default_timer() - t_start
+    job["metrics"] = _take_metrics()
+    return job
+
+
+_status_marks = dict(ok="✅", failed="❌", error="💥", unchecked="❔")
+
+
+def _run_batch(aocf, cmdargs, reader_args, time) -> bool:
+    """Run aocf over all inputs matching cmdargs.inputs, log a table of results
+
+    Inputs are checked against their .results files if present, the summary
+    counts each status. Returns whether no input failed or raised an error.
+    """
+
+    global _batch_job
+    import glob  # noqa: autoimport
+
+    filenames = sorted(
+        fn
+        for fn in glob.glob(cmdargs.inputs, recursive=True)
+        if not fn.endswith(".results")
+    )
+    if not filenames:
+        error("No inputs match %s", cmdargs.inputs)
+        return False
+    info(f"\n🎄🎄🎄 Batch of {aocf.__name__}(), {len(filenames)} inputs 🎄🎄🎄\n")
+
+    _batch_job = aocf, reader_args
+    t0 = timeit.default_timer()
+    pool = _fork_pool(cmdargs.jobs)
+    if pool:
+        with pool:
+            jobs = list(pool.map(_run_batch_job, filenames))
+    else:
+        if cmdargs.jobs > 1:
+            warn("fork is unavailable or only 1 CPU, ignoring --jobs")
+        jobs = list(map(_run_batch_job, filenames))
+    t = timeit.default_timer() - t0
+
+    rows, statuses = [], []
+    for job in jobs:
+        fn = job["input"]
+        results = job["results"]
+        if job["error"]:
+            status = "error"
+            results = results + [job["error"]]
+        elif os.path.exists(fn + ".results"):
+            passed = results == _read_results(fn + ".results")
+            status = "ok" if passed else "failed"
+        else:
+            status = "unchecked"
+        statuses.append(status)
+        if cmdargs.write_results and not job["error"]:
+            _write_results(fn + ".results", results)
+        run = _run_info(
+            aocf,
+            fn,
+            job["start"],
+            results=results,
+            status=status,
+            jobs=cmdargs.jobs,
+            setup_time=job["setup"],
+            total_time=job["total"],
+        )
+        _log_metrics(run, job["times"], job["metrics"])
+        setup = f"{job['setup'] * time[0]:_.3f}"
+        total = f"{sum(job['times']) * time[0]:_.3f}"
+        times = " ".join(f"{dt * time[0]:_.3f}" for dt in job["times"])
+        rows.append((_status_marks[status], fn, setup, total, times))
+        rows.extend(("", "", "", "", r) for r in results)
+
+    header = (
+        "",
+        "input",
+        f"setup {time[1]}",
+        f"time {time[1]}",
+        "part times / results",
+    )
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(4)]
+    for row in [header, *rows]:
+        print(*(c.ljust(w) for c, w in zip(row, widths)), row[4].replace("\n", " "))
+
+    info("\n" + ", ".join(f"{statuses.count(s)} {s}" for s in _status_marks))
+    info(f"🕚Total time: {t * time[0]:_.3f} {time[1]}\n")
+    return "failed" not in statuses and "error" not in statuses
+
+
 def run_aoc[T = int](
     aocf: AOC[T],
     *,
@@ -246,6 +631,18 @@ def run_aoc[T = int](
 
     The aocf function should yield its results of type T when they become
     available, any number is acceptable.
+
+    Alternatively aocf may return a tuple of independent part callables
+    (AOCParts), possibly empty, which are run concurrently in forked worker
+    processes. Results are still shown in order, with the time taken by
+    each part. Where fork or a second CPU is unavailable they are run
+    sequentially.
+
+    With --metrics, run info, part timings and all metrics recorded with
+    metric_count, metric_gauge and metric_span are appended as JSON lines.
+
+    With --inputs all matching input files are solved in one process, or in
+    a pool of --jobs processes, and a table of results is shown instead.
     """
 
     def lap_time(label="Time: "):
@@ -261,11 +658,29 @@ def run_aoc[T = int](
             info("🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄\n")
 
     t0 = t1 = t2 = timeit.default_timer()
+    start = _now()
     day = day or int(aocf.__name__[-2:])
-    cmdargs = mk_arg_parser(day, LOGLEVEL).parse_args()
+    parser = mk_arg_parser(day, LOGLEVEL)
+    cmdargs = parser.parse_args()
     assert not cmdargs.expect or not cmdargs.test, (
         "--expect and --test are incompatible"
     )
+    assert not cmdargs.expect or not cmdargs.inputs, (
+        "--expect and --inputs are incompatible"
+    )
+    assert not cmdargs.test or not cmdargs.inputs, (
+        "--test and --inputs are incompatible, --inputs always checks .results"
+    )
+    assert cmdargs.jobs == 1 or cmdargs.inputs, "--jobs requires --inputs"
+    assert cmdargs.input == parser.get_default("input") or not cmdargs.inputs, (
+        "--input and --example are incompatible with --inputs"
+    )
+    assert not cmdargs.timeit or not cmdargs.inputs, (
+        "--timeit is incompatible with --inputs, which always shows times"
+    )
+    assert not cmdargs.show_input or not cmdargs.inputs, (
+        "--show-input is incompatible with --inputs"
+    )
     cmdargs.results = cmdargs.input + ".results"
 
     logging.basicConfig(
@@ -276,9 +691,7 @@ def run_aoc[T = int](
     )
 
     if cmdargs.test:
-        with open(cmdargs.results) as fd:
-            parts = fd.read().replace("\\\n", "\0").splitlines()
-        cmdargs.expect = [part.replace("\0", "\n") for part in parts]
+        cmdargs.expect = _read_results(cmdargs.results)
     cmdargs.expect.reverse()
 
     if np_printoptions:
@@ -286,6 +699,17 @@ def run_aoc[T = int](
 
         np.set_printoptions(**np_printoptions)
 
+    if cmdargs.metrics:
+        _setup_metrics(cmdargs.metrics)
+
+    if cmdargs.inputs:
+        try:
+            passed = _run_batch(aocf, cmdargs, (read, split, apply, transform), time)
+        finally:
+            _release_shared()
+            logging.shutdown()
+        sys.exit(0 if passed else 1)
+
     aocf_args = read_input(cmdargs.input, read, split, apply, transform)
 
     if cmdargs.show_input:
@@ -296,9 +720,20 @@ def run_aoc[T = int](
 
     lap_time("Setup time: ")
 
+    status = "error"
+    checked = bool(cmdargs.expect)
+    results, part_times = [], []
+    setup_t = part_t = timeit.default_timer()
     try:
-        results = []
-        for i, r in enumerate(aocf(*aocf_args), start=1):
+        solved = aocf(*aocf_args)
+        if concurrent := isinstance(solved, tuple):
+            solved = _run_parts(solved)
+        for i, r in enumerate(solved, start=1):
+            if concurrent:
+                r, part_time = r
+            else:
+                part_time = timeit.default_timer() - part_t
+            part_times.append(part_time)
             info(f"\n🎄🎄🎄 Result {i} of {aocf.__name__}()  🎄🎄🎄\n")
             print(r)
             info("")
@@ -308,22 +743,39 @@ def run_aoc[T = int](
                 if str(r) == expected:
                     info("✅ matches the expected value\n")
                 else:
+                    status = "failed"
                     warn(
                         "❌ does not match %s%s\n", "\n" * ("\n" in expected), expected
                     )
+            if concurrent and cmdargs.timeit:
+                info(f"🕚 Part time: {part_time * time[0]:_.3f} {time[1]}")
             lap_time("Result time: ")
             info("🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄🎄\n")
+            part_t = timeit.default_timer()
         total_time()
+        if status != "failed":
+            status = "ok" if checked else "unchecked"
 
         if cmdargs.write_results:
             info("Writing results to %s", cmdargs.results)
-            results = [str(r).replace("\n", "\\\n") for r in results]
-            with open(cmdargs.results, "w") as fd:
-                fd.write("\n".join(results))
+            _write_results(cmdargs.results, results)
 
     except BaseException:
         error("\n🎄🎄🎄🎄🎄🎄  Error   🎄🎄🎄🎄🎄🎄\n")
         total_time()
         raise
     finally:
+        if cmdargs.metrics:
+            run = _run_info(
+                aocf,
+                cmdargs.input,
+                start,
+                results=[str(r) for r in results],
+                status=status,
+                jobs=cmdargs.jobs,
+                setup_time=setup_t - t0,
+                total_time=timeit.default_timer() - t0,
+            )
+            _log_metrics(run, part_times, _take_metrics())
+        _release_shared()
         logging.shutdown()